@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Compares load time and peak RSS of specification loaders on synthetic specification.
+
+    python3 benchmarks/spec_loading.py --definitions 20000
+"""
+import json
+import subprocess
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import yaml
+
+LOADERS = {
+    'safe_load(read_text)': 'from yaml import safe_load; safe_load(location.read_text())',
+    'load_document': 'from simpleswagger.loader import load_document; load_document(location)',
+}
+
+PROBE = '''
+import resource, sys, time
+from pathlib import Path
+location = Path(sys.argv[1])
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def synthesize(definitions: int) -> dict:
+    swagger = {'swagger': '2.0', 'basePath': '/api', 'paths': {}, 'definitions': {}}
+    for i in range(definitions):
+        swagger['definitions'][f'Object{i}'] = {
+            'type': 'object',
+            'description': f'Synthetic object number {i}',
+            'required': ['id', 'name'],
+            'properties': {
+                'id': {'type': 'integer', 'format': 'int64'},
+                'name': {'type': 'string', 'pattern': '^[a-z]+$', 'maxLength': 64},
+                'tags': {'type': 'array', 'items': {'type': 'string'}},
+                'parent': {'$ref': f'#/definitions/Object{max(i - 1, 0)}'},
+            },
+        }
+        swagger['paths'][f'/objects{i}/{{id}}'] = {'get': {
+            'operationId': f'getObject{i}',
+            'parameters': [{'in': 'path', 'name': 'id', 'type': 'integer', 'required': True}],
+            'responses': {200: {'description': 'OK', 'schema': {'$ref': f'#/definitions/Object{i}'}}},
+        }}
+    return swagger
+
+
+def main():
+    parser = ArgumentParser(description='Specification loading benchmark')
+    parser.add_argument('--definitions', '-n', type=int, default=5000, help='Number of definitions and operations')
+    args = parser.parse_args()
+
+    root = Path(__file__).parent.parent.absolute()
+    swagger = synthesize(args.definitions)
+    with TemporaryDirectory() as tmp:
+        files = [Path(tmp) / 'swagger.yaml', Path(tmp) / 'swagger.json']
+        files[0].write_text(yaml.safe_dump(swagger))
+        files[1].write_text(json.dumps(swagger))
+        print(f'{"file":<14} {"size, MB":>9} {"loader":<22} {"time, s":>8} {"peak RSS, MB":>13}')
+        for file in files:
+            for name, code in LOADERS.items():
+                out = subprocess.check_output([sys.executable, '-c', PROBE.format(code=code), str(file)], cwd=root)
+                elapsed, rss = out.split()
+                print(f'{file.name:<14} {file.stat().st_size / 2 ** 20:>9.1f} {name:<22} {float(elapsed):>8.2f} '
+                      f'{int(rss) / 1024:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
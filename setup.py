@@ -1,12 +1,30 @@
 from os import getenv
+from pathlib import Path
 
 import setuptools
+from setuptools.command.build_py import build_py
 
 version = getenv('GITHUB_REF', getenv('VERSION', 'dev')).split('/')[-1].strip('v')
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
 
+
+class BuildWithCompiledTemplates(build_py):
+    """
+    Precompiles packaged templates to bytecode cache so installed generator doesn't compile them on each run.
+    """
+
+    def run(self):
+        super().run()
+        try:
+            from simpleswagger.generator import precompile
+            precompile(Path(self.build_lib) / 'simpleswagger')
+        except ImportError as err:
+            # package without compiled templates works, but silently loses startup time
+            raise RuntimeError("templates can't be precompiled, Jinja2 is required to build the package") from err
+
+
 setuptools.setup(name="simple-swagger",
                  version=version,
                  author="Aleksandr Baryshnikov",
@@ -16,6 +34,7 @@ setuptools.setup(name="simple-swagger",
                  long_description=long_description,
                  long_description_content_type="text/markdown",
                  include_package_data=True,
+                 cmdclass={'build_py': BuildWithCompiledTemplates},
                  package_data={
                      'simpleswagger': ['templates']
                  },
@@ -0,0 +1,239 @@
+import json
+import re
+import string
+import warnings
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from urllib.parse import quote, urlencode
+
+from jinja2 import Environment
+
+from . import golang
+from .cache import Manifest
+from .schema import SchemaGraph
+
+# synthesis of strings by pattern relies on parser of re module: it is not a stable API, so without it (or if it
+# is changed) patterns are not synthesized and example from specification is expected instead
+try:
+    try:
+        from re import _parser as sre_parse
+    except ImportError:
+        import sre_parse
+
+    _CATEGORIES = {
+        sre_parse.CATEGORY_DIGIT: str.isdigit,
+        sre_parse.CATEGORY_NOT_DIGIT: lambda c: not c.isdigit(),
+        sre_parse.CATEGORY_SPACE: str.isspace,
+        sre_parse.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+        sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+        sre_parse.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == '_'),
+    }
+    _REPEATS = tuple(getattr(sre_parse, op) for op in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+                     if hasattr(sre_parse, op))
+except (ImportError, AttributeError):
+    sre_parse = None
+
+if TYPE_CHECKING:
+    from .generator import Job, Method
+
+SAMPLE_TIME = '2006-01-02T15:04:05Z'
+SAMPLE_DATE = '2006-01-02'
+SAMPLE_CREDENTIAL = 'bench'
+
+# preferred characters for synthesized strings, the first one accepted by character class is used
+_CANDIDATES = string.ascii_lowercase + string.digits + string.ascii_uppercase + '-_./:' + string.punctuation + ' '
+
+
+def _accepts(op, av, c: str) -> bool:
+    if op is sre_parse.ANY:
+        return c != '\n'
+    if op is sre_parse.LITERAL:
+        return ord(c) == av
+    if op is sre_parse.NOT_LITERAL:
+        return ord(c) != av
+    if op is sre_parse.RANGE:
+        return av[0] <= ord(c) <= av[1]
+    if op is sre_parse.CATEGORY:
+        return _CATEGORIES[av](c)
+    if op is sre_parse.IN:
+        negate = len(av) > 0 and av[0][0] is sre_parse.NEGATE
+        items = av[1:] if negate else av
+        return any(_accepts(item_op, item_av, c) for item_op, item_av in items) != negate
+    raise ValueError('unsupported regexp construction ' + str(op))
+
+
+def _expand(items, repeat: int) -> str:
+    out = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            out.append(chr(av))
+        elif op in (sre_parse.ANY, sre_parse.NOT_LITERAL, sre_parse.IN):
+            out.append(next(c for c in _CANDIDATES if _accepts(op, av, c)))
+        elif op in _REPEATS:
+            low, high, sub = av
+            out.append(_expand(sub, repeat) * max(low, min(high, repeat)))
+        elif op is sre_parse.SUBPATTERN:
+            out.append(_expand(av[-1], repeat))
+        elif op is sre_parse.BRANCH:
+            out.append(_expand(av[1][0], repeat))
+        elif op is not sre_parse.AT:
+            raise ValueError('unsupported regexp construction ' + str(op))
+    return ''.join(out)
+
+
+def sample_string(schema: dict) -> str:
+    """
+    Synthesizes string satisfying pattern and length constraints. Repetitions in pattern are unrolled the same
+    number of times, which is increased until the result fits the length.
+    """
+    min_length = schema.get('minLength', 0)
+    max_length = schema.get('maxLength', max(min_length, 16))
+    pattern = schema.get('pattern')
+    if pattern is None:
+        text = 'sample' * (min_length // 6 + 1)
+        return text[:max(min_length, min(len(text), max_length))]
+    try:
+        if sre_parse is None:
+            raise ValueError('parser of regular expressions is not available')
+        parsed = sre_parse.parse(pattern)
+        for repeat in range(1, max_length + 2):
+            text = _expand(parsed, repeat)
+            if min_length <= len(text) <= max_length and re.search(pattern, text):
+                return text
+    except (ValueError, StopIteration, AttributeError, KeyError, re.error):
+        pass
+    warnings.warn(f"sample not synthesized for pattern {pattern!r}, use example in specification")
+    return 'sample'
+
+
+def sample(schema: dict, graph: SchemaGraph, visiting: frozenset = frozenset()) -> Any:
+    """
+    Valid value of schema: example or default if defined, otherwise synthesized from type and constraints.
+    Recursive references are cut (optional fields are omitted, arrays are empty).
+    """
+    if 'schema' in schema:
+        return sample(schema['schema'], graph, visiting)
+    if '$ref' in schema:
+        name = graph.ref_name(schema['$ref'])
+        if name in visiting:
+            return None
+        return sample(graph.definitions[name], graph, visiting | {name})
+    for key in ('example', 'x-example', 'default'):
+        if key in schema:
+            return schema[key]
+    if 'enum' in schema:
+        return schema['enum'][0]
+    type_name = schema.get('type', 'object')
+    if type_name == 'object':
+        value = {}
+        for name, prop in schema.get('properties', {}).items():
+            item = sample(prop, graph, visiting)
+            if item is not None:
+                value[name] = item
+        additional = schema.get('additionalProperties')
+        if isinstance(additional, dict) and len(value) == 0:
+            item = sample(additional, graph, visiting)
+            if item is not None:
+                value['key'] = item
+        return value
+    if type_name == 'array':
+        item = sample(schema.get('items', {}), graph, visiting)
+        if item is None:
+            return []
+        size = 1 if schema.get('uniqueItems') else 3
+        size = min(max(size, schema.get('minItems', 0)), schema.get('maxItems', size))
+        return [item] * size
+    if type_name in ('integer', 'number'):
+        value = 1
+        if 'minimum' in schema:
+            value = max(value, schema['minimum'] + (1 if schema.get('exclusiveMinimum') else 0))
+        if 'maximum' in schema:
+            value = min(value, schema['maximum'] - (1 if schema.get('exclusiveMaximum') else 0))
+        return value
+    if type_name == 'boolean':
+        return True
+    fmt = schema.get('format')
+    if fmt == 'date-time':
+        return SAMPLE_TIME
+    if fmt == 'date':
+        return SAMPLE_DATE
+    if fmt == 'byte':
+        return 'c2FtcGxl'
+    return sample_string(schema)
+
+
+def to_text(value) -> str:
+    """
+    Plain text representation of scalar as expected in path, query and headers.
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def sample_request(method: 'Method', graph: SchemaGraph) -> Dict[str, Any]:
+    """
+    Sample HTTP request of operation: path (relative to API prefix, including query), headers and body.
+    """
+    path = method.path
+    query: List[tuple] = []
+    headers: Dict[str, str] = {}
+    body: Optional[str] = None
+    for param in method.parameters:
+        value = sample(param.type, graph)
+        if param.location == 'path':
+            path = path.replace('{' + param.name + '}', quote(to_text(value), safe=''))
+        elif param.location == 'query':
+            query.append((param.name, to_text(value)))
+        elif param.location == 'header':
+            headers[param.name] = to_text(value)
+        elif param is method.binary_body:
+            headers['Content-Type'] = 'application/octet-stream'
+            body = 'sample'
+        elif param.location == 'body':
+            if method.consumes_json:
+                headers['Content-Type'] = 'application/json'
+                body = json.dumps(value, separators=(',', ':'))
+            else:
+                headers['Content-Type'] = 'text/plain'
+                body = to_text(value)
+    for security in method.security:
+        definition = graph.swagger['securityDefinitions'][next(iter(security.keys()))]
+        if definition.get('in') == 'header':
+            headers[definition['name']] = SAMPLE_CREDENTIAL
+            break
+    if query:
+        path += '?' + urlencode(query)
+    return {'path': path, 'headers': headers, 'body': body}
+
+
+def install_filters(env: Environment, graph: SchemaGraph):
+    golang.install_filters(env, graph)
+    env.filters['sample_json'] = lambda x: json.dumps(sample(x, graph), separators=(',', ':'))
+    env.filters['sample_request'] = lambda x: sample_request(x, graph)
+
+
+def render(graph: SchemaGraph, env: Environment, job: 'Job', manifest: Manifest):
+    """
+    Renders Go benchmark package into output directory. Generated API package (by golang target) is expected
+    in the parent directory.
+    """
+    install_filters(env, graph)
+    graph.intern('go_type', golang.map_type)
+    security_type = golang.GoType.parse(graph.swagger.get('x-go-credential-type', 'Credential'), 'security')
+    output = job.output
+    output.absolute().mkdir(parents=True, exist_ok=True)
+    api_package = golang.detect_package(output.absolute().parent)
+    header = f"// Code generated by simple-swagger {' '.join(job.arguments)} DO NOT EDIT."
+    params = dict(
+        header=header,
+        package=golang.private(output.absolute().name.replace('-', '_')),
+        credential_type=security_type,
+        api_package=api_package,
+    )
+    manifest.write(output / "bench.go", env.get_template('bench/bench.jinja2').render(**params))
+    manifest.write(output / "bench_test.go", env.get_template('bench/bench_test.jinja2').render(**params))
+
+
+def format_files(files: List[Path]):
+    golang.format_files(files)
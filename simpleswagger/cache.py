@@ -0,0 +1,148 @@
+import json
+import os
+from dataclasses import dataclass, asdict
+from hashlib import sha256
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, Iterable, List, Optional
+
+MANIFEST_NAME = '.simple-swagger.json'
+
+
+def generator_version() -> str:
+    from importlib import metadata
+    try:
+        return metadata.version('simple-swagger')
+    except metadata.PackageNotFoundError:
+        return 'dev'
+
+
+def digest(content: bytes) -> str:
+    return sha256(content).hexdigest()
+
+
+def generation_key(swagger_file: Path, dependencies: Iterable[str], templates: Path, args: Iterable[str]) -> str:
+    """
+    Hash of everything that affects generated content: specification with referenced documents, templates,
+    generator sources and arguments.
+    """
+    hasher = sha256()
+    hasher.update(generator_version().encode())
+    for arg in args:
+        hasher.update(b'\0' + arg.encode())
+    hasher.update(b'\0' + swagger_file.read_bytes())
+    for dependency in dependencies:
+        hasher.update(b'\0' + dependency.encode())
+        try:
+            hasher.update(b'\0' + Path(dependency).read_bytes())
+        except OSError:
+            hasher.update(b'\0')  # removed document: key differs from the one it was saved with
+    sources = sorted(Path(__file__).parent.glob('*.py')) + sorted(p for p in templates.rglob('*') if p.is_file())
+    for source in sources:
+        hasher.update(b'\0' + str(source.relative_to(source.parent.parent)).encode())
+        hasher.update(b'\0' + source.read_bytes())
+    return hasher.hexdigest()
+
+
+def atomic_write(file: Path, content: bytes):
+    file.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = file.stat().st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    with NamedTemporaryFile(dir=file.parent, prefix='.' + file.name + '.', delete=False) as tmp:
+        tmp.write(content)
+    os.chmod(tmp.name, mode)
+    os.replace(tmp.name, file)
+
+
+@dataclass
+class Entry:
+    rendered: str  # hash of content produced by templates
+    stored: str  # hash of content on disk (after formatting)
+
+
+class Manifest:
+    """
+    Content-hashed record of generated files stored in output directory.
+    Generation is skipped if key is the same and all files are untouched. Documents referenced by specification
+    are recorded as dependencies, so their changes are detected before specification is loaded.
+    Only files with changed content are written (atomically) and formatted.
+    """
+
+    def __init__(self, root: Path, key: str, previous: Optional['Manifest'] = None, dependencies: Iterable[str] = ()):
+        self.root = root
+        self.key = key
+        self.dependencies: List[str] = list(dependencies)
+        self.previous: Dict[str, Entry] = previous.files if previous is not None else {}
+        self.files: Dict[str, Entry] = {}
+        self.changed: List[Path] = []
+
+    @property
+    def location(self) -> Path:
+        return self.root / MANIFEST_NAME
+
+    @staticmethod
+    def load(root: Path) -> Optional['Manifest']:
+        try:
+            data = json.loads((root / MANIFEST_NAME).read_text())
+            manifest = Manifest(root, data['key'], dependencies=data.get('dependencies', ()))
+            manifest.files = dict((name, Entry(**entry)) for name, entry in data['files'].items())
+            return manifest
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def is_fresh(self, key: str) -> bool:
+        """
+        Checks that loaded manifest has the same key and all generated files are untouched.
+        """
+        if self.key != key or len(self.files) == 0:
+            return False
+        for name, entry in self.files.items():
+            try:
+                if digest((self.root / name).read_bytes()) != entry.stored:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def write(self, file: Path, content: str) -> bool:
+        """
+        Writes content to the file if it differs from the previous generation. Returns true if file was written.
+        """
+        data = content.encode()
+        rendered = digest(data)
+        name = os.path.relpath(file, self.root)
+        entry = self.previous.get(name)
+        if entry is not None and entry.rendered == rendered:
+            try:
+                if digest(file.read_bytes()) == entry.stored:
+                    self.files[name] = entry
+                    return False
+            except OSError:
+                pass
+        atomic_write(file, data)
+        self.files[name] = Entry(rendered, rendered)
+        self.changed.append(file)
+        return True
+
+    def save(self):
+        """
+        Saves manifest and removes files generated previously but not by this generation.
+        Should be called after formatting to capture final content of changed files.
+        """
+        for name in self.previous.keys() - self.files.keys():
+            try:
+                (self.root / name).unlink()
+            except FileNotFoundError:
+                pass
+        for file in self.changed:
+            self.files[os.path.relpath(file, self.root)].stored = digest(file.read_bytes())
+        atomic_write(self.location, json.dumps({
+            'key': self.key,
+            'dependencies': self.dependencies,
+            'files': dict((name, asdict(entry)) for name, entry in sorted(self.files.items())),
+        }, indent=2).encode())
+
@@ -0,0 +1,66 @@
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from jinja2 import BytecodeCache, FileSystemBytecodeCache
+from jinja2.bccache import Bucket
+
+COMPILED_DIR = Path(__file__).parent.absolute() / '_compiled'
+
+
+class MemoryBytecodeCache(BytecodeCache):
+    """
+    Process-local cache of compiled templates shared between environments of different specifications.
+    Misses are delegated to the optional persistent cache.
+    """
+
+    def __init__(self, persistent: Optional[BytecodeCache] = None):
+        self._compiled: Dict[str, Tuple[str, object]] = {}
+        self._persistent = persistent
+
+    def get_cache_key(self, name: str, filename: Optional[str] = None) -> str:
+        # bucket key is passed to the persistent cache as is, so both must agree on it
+        if self._persistent is not None:
+            return self._persistent.get_cache_key(name, filename)
+        return super().get_cache_key(name, filename)
+
+    def load_bytecode(self, bucket: Bucket):
+        cached = self._compiled.get(bucket.key)
+        if cached is not None and cached[0] == bucket.checksum:
+            bucket.code = cached[1]
+            return
+        if self._persistent is not None:
+            self._persistent.load_bytecode(bucket)
+            if bucket.code is not None:
+                self._compiled[bucket.key] = (bucket.checksum, bucket.code)
+
+    def dump_bytecode(self, bucket: Bucket):
+        self._compiled[bucket.key] = (bucket.checksum, bucket.code)
+        if self._persistent is not None:
+            self._persistent.dump_bytecode(bucket)
+
+
+class PackageBytecodeCache(FileSystemBytecodeCache):
+    """
+    Compiled templates stored beside the package. Filled at build time only (see setup.py): at runtime the cache is
+    read-only, since site-packages may be not writable and must not collect stray files. Keys do not depend on
+    absolute location of templates, so cache made in build directory is valid after installation; stale entries
+    are rejected by source checksum.
+    """
+
+    def __init__(self, directory: Path = COMPILED_DIR, writable: bool = False):
+        super().__init__(str(directory))
+        self._location = directory
+        self._writable = writable
+
+    def get_cache_key(self, name: str, filename: Optional[str] = None) -> str:
+        return super().get_cache_key(name)
+
+    def dump_bytecode(self, bucket: Bucket):
+        if not self._writable:
+            return
+        self._location.mkdir(parents=True, exist_ok=True)
+        super().dump_bytecode(bucket)
+
+
+def default_bytecode_cache() -> BytecodeCache:
+    return MemoryBytecodeCache(PackageBytecodeCache())
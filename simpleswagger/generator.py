@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
+import json
+import os
+import re
+import sys
 from argparse import ArgumentParser
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from functools import cached_property
+from glob import glob
 from pathlib import Path
-from typing import Iterable, List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Sequence, Tuple, TYPE_CHECKING
 
-from jinja2 import Environment, FileSystemLoader
-from yaml import safe_load
+from . import timings
+from .cache import Manifest, generation_key
+from .gomod import detect_package
+from .loader import load_document
+from .schema import SchemaGraph, bundle
+
+if TYPE_CHECKING:
+    from jinja2 import BytecodeCache, Environment
 
 
 def iter_enums(swagger: dict):
@@ -53,6 +64,125 @@ class PathPart:
     param: Optional[Parameter] = None
 
 
+_DURATION_UNITS = {'ns': 1e-9, 'us': 1e-6, 'µs': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600}
+_DURATION = re.compile(r'(\d+(?:\.\d*)?)(ns|us|µs|ms|s|m|h)')
+
+
+def parse_duration(value) -> float:
+    """
+    Parses duration from spec extension into seconds: number of seconds or Go-style duration ("150ms", "1m30s").
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    parts = _DURATION.findall(text)
+    if not parts or ''.join(number + unit for number, unit in parts) != text:
+        raise ValueError(f"invalid duration {value!r}")
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+@dataclass(frozen=True)
+class Policy:
+    """
+    Execution policy of operation in clients: retries (x-retry), per-attempt timeout (x-timeout) and hedged
+    requests (x-hedge-after). Durations are in seconds, zero means not set.
+    """
+    attempts: int = 0
+    backoff: float = 0
+    max_backoff: float = 0
+    timeout: float = 0
+    hedge_after: float = 0
+
+    @staticmethod
+    def parse(definition: dict, defaults: dict) -> 'Policy':
+        """
+        Reads policy from operation definition, falling back to top-level extensions of specification.
+        x-retry is number of retries or object with `retries`, `backoff` and `max-backoff`.
+        """
+        retry = definition.get('x-retry', defaults.get('x-retry'))
+        timeout = definition.get('x-timeout', defaults.get('x-timeout', 0))
+        hedge_after = definition.get('x-hedge-after', defaults.get('x-hedge-after', 0))
+        if retry is None:
+            retry = {'retries': 1 if hedge_after else 0}
+        elif not isinstance(retry, dict):
+            retry = {'retries': retry}
+        retries = int(retry.get('retries', 0))
+        if retries <= 0:
+            return Policy(timeout=parse_duration(timeout))
+        return Policy(
+            attempts=retries + 1,
+            backoff=parse_duration(retry.get('backoff', '100ms')),
+            max_backoff=parse_duration(retry.get('max-backoff', '5s')),
+            timeout=parse_duration(timeout),
+            hedge_after=parse_duration(hedge_after),
+        )
+
+
+@dataclass(frozen=True)
+class Cache:
+    """
+    Server-side caching of operation responses (x-cache): `true` or object with `ttl` (duration, one minute by default)
+    and `vary` (request headers which select different responses). Header parameters of operation always select.
+    """
+    ttl: float
+    vary: Tuple[str, ...] = ()
+
+    @staticmethod
+    def parse(value) -> Optional['Cache']:
+        if not value:
+            return None
+        if not isinstance(value, dict):
+            value = {}
+        return Cache(ttl=parse_duration(value.get('ttl', '1m')), vary=tuple(value.get('vary', ())))
+
+
+@dataclass(frozen=True)
+class Batch:
+    """
+    Batch endpoint (x-batch at top level): `true` or object with `path`, `concurrency` (invocations of single batch
+    executed in parallel) and `max-calls` (invocations in single batch).
+    """
+    path: str = '/_batch'
+    concurrency: int = 8
+    max_calls: int = 100
+
+    @staticmethod
+    def parse(value) -> Optional['Batch']:
+        if not value:
+            return None
+        if not isinstance(value, dict):
+            value = {}
+        return Batch(path=value.get('path', '/_batch'), concurrency=int(value.get('concurrency', 8)),
+                     max_calls=int(value.get('max-calls', 100)))
+
+
+PRIORITIES = ('critical', 'normal', 'low')
+
+
+@dataclass(frozen=True)
+class Limit:
+    """
+    Concurrency limit of operation in generated server (x-max-concurrency): up to `concurrency` requests are executed
+    at once, up to `queue` more (x-max-queue, same as concurrency by default) wait for a free slot during `timeout`
+    (x-queue-timeout, 100ms by default). The rest are rejected by 503 response with Retry-After.
+    """
+    concurrency: int
+    queue: int
+    timeout: float
+
+    @staticmethod
+    def parse(definition: dict, defaults: dict) -> Optional['Limit']:
+        """
+        Reads limit from operation definition, falling back to top-level extensions of specification.
+        """
+        concurrency = int(definition.get('x-max-concurrency', defaults.get('x-max-concurrency', 0)))
+        if concurrency <= 0:
+            return None
+        queue = int(definition.get('x-max-queue', defaults.get('x-max-queue', concurrency)))
+        timeout = parse_duration(definition.get('x-queue-timeout', defaults.get('x-queue-timeout', '100ms')))
+        return Limit(concurrency=concurrency, queue=max(queue, 0), timeout=timeout)
+
+
 @dataclass(frozen=True)
 class Method:
     method: str
@@ -95,6 +225,83 @@ class Method:
     def response_type(self) -> dict:
         return self.definition['responses'][200]['schema']
 
+    @property
+    def stream(self) -> bool:
+        """
+        Operation opted-in (x-stream: true) to process arrays item by item instead of whole slices.
+        """
+        return bool(self.definition.get('x-stream', False))
+
+    @property
+    def stream_response(self) -> bool:
+        return self.stream and self.response_is_array
+
+    @cached_property
+    def stream_body(self) -> Optional[Parameter]:
+        body = self.body
+        if self.stream and body is not None and body.type.get('type') == 'array':
+            return body
+        return None
+
+    @cached_property
+    def binary_body(self) -> Optional[Parameter]:
+        """
+        Body of application/octet-stream operation: passed to implementation as reader without buffering.
+        """
+        if 'application/octet-stream' in self.consumes:
+            return self.body
+        return None
+
+    @property
+    def max_body_size(self) -> int:
+        """
+        Limit of request body size in bytes (x-max-body-size). Zero means server default.
+        """
+        return int(self.definition.get('x-max-body-size', 0))
+
+    @cached_property
+    def policy(self) -> Policy:
+        """
+        Retry, timeout and hedging policy of the operation for clients (x-retry, x-timeout, x-hedge-after).
+        """
+        return Policy.parse(self.definition, self.swagger)
+
+    @cached_property
+    def cache(self) -> Optional[Cache]:
+        """
+        Response caching of GET operation (x-cache). Streamed responses are never cached.
+        """
+        if self.method != 'get' or not self.has_response or self.stream_response:
+            return None
+        return Cache.parse(self.definition.get('x-cache'))
+
+    @cached_property
+    def priority(self) -> str:
+        """
+        Load shedding priority (x-priority): critical operations are never limited, low priority ones are rejected
+        at once instead of waiting in queue when limit is reached.
+        """
+        priority = self.definition.get('x-priority', 'normal')
+        if priority not in PRIORITIES:
+            raise ValueError(f"{self.name}: x-priority should be one of {', '.join(PRIORITIES)}, got {priority!r}")
+        return priority
+
+    @cached_property
+    def limit(self) -> Optional[Limit]:
+        """
+        Own concurrency limit of operation (x-max-concurrency). Critical operations are never limited.
+        """
+        if self.priority == 'critical':
+            return None
+        return Limit.parse(self.definition, self.swagger)
+
+    @cached_property
+    def validated_parameters(self) -> List[Parameter]:
+        """
+        Parameters validated before calling implementation (streamed body validated per item, binary is not checked).
+        """
+        return [p for p in self.parameters if p is not self.stream_body and p is not self.binary_body]
+
     @property
     def secured(self) -> bool:
         return len(self.definition.get('security', [])) > 0
@@ -170,49 +377,61 @@ class Object:
     swagger: dict
 
 
-def move_schema(swagger: dict, schema: dict, object_name: str, ignore_top_object=False):
-    type_name = schema.get('type')
-    if type_name == 'object':
-        obj = schema
-        if not ignore_top_object:
-            obj = move_object_to_definition(swagger, schema, object_name)
-        for field_name, field_definition in obj.get('properties', {}).items():
-            nested_object_name = object_name + field_name.title()
-            move_schema(swagger, field_definition, nested_object_name)
-    elif type_name == 'array':
-        move_schema(swagger, schema['items'], object_name)
+def unique_name(definitions: dict, name: str) -> str:
+    candidate, index = name, 1
+    while candidate in definitions:
+        index += 1
+        candidate = name + str(index)
+    return candidate
 
 
 def move_objects_to_definitions(swagger: dict):
-    # collect unnamed objects in params and responses
-    for methods in swagger.get('paths', {}).values():
-        for definition in methods.values():
-            # params
-            for parameter in definition.get('parameters', []):
+    """
+    Moves anonymous objects (in body parameters, responses and nested in properties or array items) to definitions
+    and replaces them by references. Objects are processed children-first by an explicit worklist, so every
+    schema is visited and fingerprinted once. Structurally identical objects share one definition.
+    Names are derived from the location (Operation + Parameter, Operation + Response + code, Parent + Field)
+    and suffixed by a number in case of collision.
+    """
+    definitions = swagger.setdefault('definitions', {})
+    # (schema, suggested name, move to definitions, children already processed)
+    stack: List[Tuple[dict, str, bool, bool]] = []
+
+    for name, definition in reversed(list(definitions.items())):
+        stack.append((definition, name, False, False))
+
+    for methods in reversed(list(swagger.get('paths', {}).values())):
+        for definition in reversed(list(methods.values())):
+            operation = pascal_case(definition['operationId'])
+            for code, response in reversed(list(definition.get('responses', {}).items())):
+                stack.append((response.get('schema', {}), operation + "Response" + str(code), True, False))
+            for parameter in reversed(definition.get('parameters', [])):
                 if parameter['in'] == 'body':
-                    name = definition['operationId'] + parameter['name'].title()
-                    move_schema(swagger, parameter['schema'], name)
-
-            # responses
-            for code, response in definition.get('responses', {}).items():
-                name = definition['operationId'] + "Response" + str(code)
-                move_schema(swagger, response.get('schema', {}), name)
-
-    # recursive unpack of all definitions
-    for name, definition in swagger.get('definitions', {}).items():
-        move_schema(swagger, definition, name, ignore_top_object=True)
-
-
-def move_object_to_definition(swagger: dict, definition: dict, name) -> dict:
-    if 'definitions' not in swagger:
-        swagger['definitions'] = {}
-    assert name not in swagger['definitions'], f'object {name} already defined'
-    cp = swagger['definitions'][name] = definition.copy()
-    definition.clear()
-    definition['$ref'] = {
-        '$ref': '#/definitions/' + name
-    }
-    return cp
+                    stack.append((parameter['schema'], operation + parameter['name'].title(), True, False))
+
+    fingerprints: Dict[str, str] = {}
+    while stack:
+        schema, name, move, processed = stack.pop()
+        type_name = schema.get('type')
+        if type_name == 'array':
+            stack.append((schema.get('items', {}), name, True, False))
+            continue
+        if type_name != 'object':
+            continue
+        if not processed:
+            if move:
+                stack.append((schema, name, True, True))
+            for field_name, field_definition in reversed(list(schema.get('properties', {}).items())):
+                stack.append((field_definition, name + field_name.title(), True, False))
+            continue
+
+        fingerprint = json.dumps(schema, sort_keys=True, default=str)
+        shared_name = fingerprints.get(fingerprint)
+        if shared_name is None:
+            shared_name = fingerprints[fingerprint] = unique_name(definitions, name)
+            definitions[shared_name] = dict(schema)
+        schema.clear()
+        schema['$ref'] = '#/definitions/' + shared_name
 
 
 def cast(value, definition: dict) -> str:
@@ -225,44 +444,81 @@ def comment(text: str) -> str:
     return '\n'.join('// ' + line for line in text.splitlines())
 
 
-def resolve(definition: dict, swagger: dict):
-    if 'schema' in definition:
-        return resolve(definition['schema'], swagger)
-    if '$ref' in definition:
-        name = definition['$ref'].split('/')[-1]
-        return swagger['definitions'][name]
-    return definition
-
-
 def pascal_case(text: str) -> str:
     return "".join(x[:1].upper() + x[1:] for x in text.split('_'))
 
 
-def main():
-    parser = ArgumentParser(description='Zombie swagger 2.0')
-    parser.add_argument('--swagger', '-s', type=Path, default=(Path.cwd() / "swagger.yaml"),
-                        help='Location of swagger file')
-    parser.add_argument('--output', '-o', type=Path, default=(Path.cwd() / "api"),
-                        help='Output directory')
-    parser.add_argument('--templates', '-t', type=Path, default=(Path(__file__).parent.absolute() / 'templates'),
-                        help='Templates location')
-    parser.add_argument('--lang', '-l', type=str, default='golang', help='Target generator')
-    args = parser.parse_args()
+@dataclass(frozen=True)
+class Job:
+    swagger: Path
+    output: Path
+    templates: Path
+    lang: str = 'golang'
+    arguments: Tuple[str, ...] = ()
+    force: bool = False
+    tests: bool = False
+    fast_json: bool = False
+    split_tags: bool = False
+    functions: bool = False
 
-    env = Environment(loader=FileSystemLoader(args.templates))
+    @property
+    def flags(self) -> Tuple[str, ...]:
+        """
+        Generation options as command line arguments.
+        """
+        flags = []
+        if self.tests:
+            flags.append('--tests')
+        if self.fast_json:
+            flags.append('--fast-json')
+        if self.split_tags:
+            flags.append('--split-tags')
+        if self.functions:
+            flags.append('--functions')
+        return tuple(flags)
+
+
+def backend(lang: str):
+    if lang == 'golang':
+        from . import golang
+        return golang
+    if lang == 'typescript':
+        from . import typescript
+        return typescript
+    if lang == 'bench':
+        from . import bench
+        return bench
+    raise AssertionError('unknown language ' + lang)
+
+
+def create_environment(templates: Path, graph: SchemaGraph,
+                       bytecode_cache: Optional['BytecodeCache'] = None) -> 'Environment':
+    from jinja2 import Environment, FileSystemLoader
+
+    env = Environment(loader=FileSystemLoader(str(templates)), bytecode_cache=bytecode_cache)
     env.filters['cast'] = cast
     env.filters['comment'] = comment
     env.filters['pascal'] = pascal_case
     env.filters['secured'] = lambda x: len(x.get('security', [])) > 0
-    env.filters['sec_def'] = lambda x: swagger['securityDefinitions'][x]
-    env.filters['resolve'] = lambda x: resolve(x, swagger)
+    env.filters['sec_def'] = lambda x: graph.swagger['securityDefinitions'][x]
+    env.filters['resolve'] = graph.target
+    env.filters['needs_validation'] = graph.needs_validation
     env.filters['has_payload'] = lambda x: any(param for param in x.get('parameters', []) if param['in'] == 'body')
     env.filters['is_ref_to_type'] = lambda x: '$ref' in x or '$ref' in x.get('schema', {})
     env.filters['has_query_params'] = lambda x: any(
         param for param in x.get('parameters', []) if param['in'] == 'query')
     # filter params by place (body, query, ...)
     env.filters['inside'] = lambda params, place: (p for p in params if p['in'] == place)
-    swagger = safe_load(args.swagger.read_text())
+    return env
+
+
+def prepare(swagger: dict, location: Path) -> List[Path]:
+    """
+    Normalizes loaded specification in place. Returns locations of other documents it references.
+    """
+    # inline parameters/responses references and import external definitions
+    with timings.phase('bundle'):
+        dependencies = bundle(swagger, location)
 
     # apply default security
     default_security = swagger.get('security', [])
@@ -278,8 +534,60 @@ def main():
             if 'operationId' not in endpoint:
                 endpoint['operationId'] = calc_endpoint_name(method, path)
 
-                # remove anonymous object definitions
-    move_objects_to_definitions(swagger)
+    # remove anonymous object definitions
+    with timings.phase('hoist'):
+        move_objects_to_definitions(swagger)
+    return dependencies
+
+
+_bytecode_cache: Optional['BytecodeCache'] = None
+
+
+def bytecode_cache() -> 'BytecodeCache':
+    """
+    Compiled templates cache shared by all specifications rendered by current process.
+    """
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        from .compiled import default_bytecode_cache
+        _bytecode_cache = default_bytecode_cache()
+    return _bytecode_cache
+
+
+def target_package(job: Job) -> str:
+    """
+    Go package which generated code is placed to (and imports), empty for other targets.
+    """
+    if job.lang not in ('golang', 'bench'):
+        return ''
+    output = job.output.absolute()
+    try:
+        return detect_package(output if job.lang == 'golang' else output.parent)
+    except FileNotFoundError:
+        return ''  # reported by render
+
+
+def generate(job: Job) -> Optional[Manifest]:
+    """
+    Renders and writes files for single specification. Formatting is up to caller.
+    Returns None if cached output is still valid.
+    """
+    with timings.phase('check cache'):
+        arguments = [job.lang, str(job.output.absolute()), target_package(job), *job.arguments]
+        previous = Manifest.load(job.output)
+        if not job.force and previous is not None:
+            key = generation_key(job.swagger, previous.dependencies, job.templates, arguments)
+            if previous.is_fresh(key):
+                return None
+
+    with timings.phase('load'):
+        swagger = load_document(job.swagger)
+    dependencies = [str(document) for document in prepare(swagger, job.swagger)]
+    key = generation_key(job.swagger, dependencies, job.templates, arguments)
+    manifest = Manifest(job.output, key, previous, dependencies)
+    graph = SchemaGraph(swagger)
+    env = create_environment(job.templates, graph, bytecode_cache())
+    timings.instrument(env)
 
     methods = tuple(sorted(iter_methods(swagger), key=lambda m: m.name))
     enums = tuple(sorted(iter_enums(swagger), key=lambda kv: kv[0]))
@@ -296,7 +604,7 @@ def main():
     type_aliases = dict((name, definition) for (name, definition) in swagger.get('definitions', {}).items()
                         if 'enum' not in definition and definition.get('type', '') != 'object')
 
-    env.globals = {
+    env.globals.update({
         'swagger': swagger,
         'methods': methods,
         'tags': methods_by_tag,
@@ -305,18 +613,166 @@ def main():
         'objects': objects,
         'type_aliases': type_aliases,
         'has_security': len(swagger.get('securityDefinitions', {})) > 0,
-    }
+        'batch': Batch.parse(swagger.get('x-batch')),
+    })
+
+    with timings.phase('render ' + job.lang):
+        backend(job.lang).render(graph, env, job, manifest)
+    return manifest
+
+
+def finalize(jobs: Sequence[Job], manifests: Sequence[Optional[Manifest]]):
+    """
+    Runs formatter once per language over all changed files and saves manifests.
+    """
+    changed: Dict[str, List[Path]] = defaultdict(list)
+    for job, manifest in zip(jobs, manifests):
+        if manifest is not None:
+            changed[job.lang].extend(manifest.changed)
+    for lang, files in changed.items():
+        if len(files) > 0:
+            with timings.phase('format ' + lang):
+                backend(lang).format_files(files)
+    with timings.phase('save'):
+        for manifest in manifests:
+            if manifest is not None:
+                manifest.save()
+
+
+def collect_jobs(patterns: Iterable[str], jobs_file: Optional[Path], defaults: Job) -> List[Job]:
+    """
+    Builds jobs from jobs file (YAML/JSON list of objects with swagger, output and optional lang) and from glob
+    patterns of specifications. For specifications matched by pattern output is placed next to the
+    specification with the same name as output directory. Other settings are taken from defaults.
+    Paths in arguments (header of generated files) are kept as given, so output doesn't depend on location of checkout.
+    """
+    jobs: Dict[Path, Job] = {}
+
+    def add(spec: Path, out: Path, lang: str):
+        arguments = ('-s', str(spec), '-o', str(out), '-l', lang, *defaults.flags)
+        spec, out = Path(os.path.abspath(spec)), Path(os.path.abspath(out))
+        previous = jobs.get(out)
+        if previous is not None and (previous.swagger, previous.lang) != (spec, lang):
+            raise ValueError(f"{spec}: output {out} is already used by {previous.swagger} ({previous.lang})")
+        jobs[out] = replace(defaults, swagger=spec, output=out, lang=lang, arguments=arguments)
+
+    if jobs_file is not None:
+        for item in load_document(jobs_file) or []:
+            add(jobs_file.parent / item['swagger'], jobs_file.parent / item['output'], item.get('lang', defaults.lang))
+    for pattern in patterns:
+        for spec in sorted(glob(pattern, recursive=True)):
+            spec = Path(spec)
+            add(spec, spec.parent / defaults.output.name, defaults.lang)
+    return list(jobs.values())
+
+
+def generation_arguments(argv: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Command line arguments which affect generated content: diagnostic options and --force are excluded, so they don't
+    change header of generated files and don't invalidate cache.
+    """
+    arguments = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '--profile':
+            skip = True
+        elif arg not in ('--timings', '--force', '-f') and not arg.startswith('--profile='):
+            arguments.append(arg)
+    return tuple(arguments)
+
+
+def precompile(package: Path):
+    """
+    Compiles all templates of the package into the bytecode cache beside it. Used at build time.
+    """
+    from . import bench, typescript
+    from .compiled import PackageBytecodeCache
+
+    graph = SchemaGraph({})
+    env = create_environment(package / 'templates', graph, PackageBytecodeCache(package / '_compiled', writable=True))
+    bench.install_filters(env, graph)
+    typescript.install_filters(env, graph)
+    for name in env.list_templates(extensions=['jinja2']):
+        env.get_template(name)
 
-    lang = args.lang
 
-    if lang == 'golang':
-        from .golang import render
-        render(swagger, env, args.output)
-    elif lang == 'typescript':
-        from .typescript import render
-        render(swagger, env, args.output)
+def main():
+    parser = ArgumentParser(description='Zombie swagger 2.0')
+    parser.add_argument('--swagger', '-s', type=Path, default=(Path.cwd() / "swagger.yaml"),
+                        help='Location of swagger file')
+    parser.add_argument('--output', '-o', type=Path, default=(Path.cwd() / "api"),
+                        help='Output directory')
+    parser.add_argument('--templates', '-t', type=Path, default=(Path(__file__).parent.absolute() / 'templates'),
+                        help='Templates location')
+    parser.add_argument('--lang', '-l', type=str, default='golang',
+                        help='Target generator: golang, typescript or bench (Go benchmarks and load test of '
+                             'generated server, output directory should be inside output of golang target)')
+    parser.add_argument('--force', '-f', action='store_true', default=False,
+                        help='Ignore cache and regenerate all files')
+    parser.add_argument('--tests', action='store_true', default=False,
+                        help='Generate tests and benchmarks for generated code (golang)')
+    parser.add_argument('--fast-json', action='store_true', default=False,
+                        help='Generate reflection-free JSON methods for definitions (golang), '
+                             'same as x-go-fast-json: true in specification')
+    parser.add_argument('--split-tags', action='store_true', default=False,
+                        help='Generate package with own server and client per tag, definitions are shared by '
+                             'the root package (golang), same as x-go-split-tags: true in specification; '
+                             'generate module per tag in functions mode (typescript), same as x-ts-split-tags: true')
+    parser.add_argument('--functions', action='store_true', default=False,
+                        help='Generate standalone function per operation instead of API class, so unused '
+                             'operations can be dropped by bundlers (typescript), '
+                             'same as x-ts-functions: true in specification')
+    parser.add_argument('--batch', '-b', type=str, nargs='+', default=[],
+                        help='Batch mode: glob patterns of swagger files. '
+                             'Output is placed next to each file in directory with name of --output')
+    parser.add_argument('--jobs', '-j', type=Path, default=None,
+                        help='Batch mode: YAML/JSON list of {swagger, output, lang} (paths relative to the file)')
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count(),
+                        help='Batch mode: number of parallel workers')
+    parser.add_argument('--timings', action='store_true', default=False,
+                        help='Print wall time and peak memory of generation phases and templates to stderr')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Save cProfile statistics of generation to the file (see python -m pstats)')
+    args = parser.parse_args()
+
+    defaults = Job(args.swagger, args.output, args.templates, args.lang, generation_arguments(sys.argv[1:]),
+                   force=args.force,
+                   tests=args.tests,
+                   fast_json=args.fast_json,
+                   split_tags=args.split_tags,
+                   functions=args.functions)
+    if len(args.batch) == 0 and args.jobs is None:
+        jobs = [defaults]
     else:
-        raise AssertionError('unknown language ' + lang)
+        jobs = collect_jobs(args.batch, args.jobs, defaults)
+
+    profiler = None
+    if args.profile is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.timings:
+        timings.enable()
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        # diagnostics are collected in the current process only
+        if len(jobs) == 1 or args.workers <= 1 or args.timings or profiler is not None:
+            manifests = [generate(job) for job in jobs]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                manifests = list(pool.map(generate, jobs))
+
+        finalize(jobs, manifests)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(args.profile))
+    if args.timings:
+        timings.enable().report()
 
 
 if __name__ == '__main__':
@@ -1,13 +1,19 @@
+import json
 import re
-import sys
-from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
 from subprocess import check_call, SubprocessError
-from typing import Optional, List
+from typing import Dict, Optional, List, Sequence, Tuple, TYPE_CHECKING
 
 from jinja2 import Environment
 
+from .cache import Manifest
+from .gomod import detect_package
+from .schema import SchemaGraph
+
+if TYPE_CHECKING:
+    from .generator import Job, Method, Parameter
+
 
 @dataclass(frozen=True)
 class GoType:
@@ -124,18 +130,18 @@ def to_string(definition: dict, param: str) -> str:
     return f'fmt.Sprint({param})'
 
 
-def default_value(definition: dict, swagger: dict) -> str:
+def default_value(definition: dict, graph: SchemaGraph) -> str:
     if 'schema' in definition:
         # work-around for parameters
-        return default_value(definition['schema'], swagger)
+        return default_value(definition['schema'], graph)
 
     ref = definition.get('$ref')
     if ref is not None:
-        type_name = ref.split('/')[-1]
-        child = swagger.get('definitions', {}).get(type_name, {})
+        type_name = graph.ref_name(ref)
+        child = graph.definitions.get(type_name, {})
         if child.get("type", 'object') == 'object':
             return type_name + "{}"
-        return default_value(child, swagger)
+        return graph.lookup('go_default', child, lambda x: default_value(x, graph))
 
     type_name = definition['type']
 
@@ -153,23 +159,375 @@ def default_value(definition: dict, swagger: dict) -> str:
     return type_name + '"{}"'
 
 
-def path(text: str) -> str:
-    return re.sub(r'{(.*?)}', ':\\1', text)
+def json_kind(definition: dict) -> str:
+    """
+    How value of the schema is encoded by generated reflection-free JSON code.
+    """
+    if 'schema' in definition:
+        return json_kind(definition['schema'])
+    if '$ref' in definition:
+        return 'ref'
+    if 'type' not in definition:
+        return 'any'
+    type_name = map_type(definition)
+    if type_name == 'time.Time':
+        return 'time'
+    if type_name == 'string':
+        return 'string'
+    if type_name == 'bool':
+        return 'boolean'
+    if type_name in ('float32', 'float64'):
+        return 'number'
+    if type_name.startswith('uint'):
+        return 'unsigned'
+    if type_name.startswith('int'):
+        return 'integer'
+    if type_name.startswith('[]'):
+        return 'array'
+    return 'any'
+
+
+def json_bits(definition: dict) -> int:
+    return 32 if map_type(definition).endswith('32') else 64
+
+
+def json_present(definition: dict, expr: str, graph: SchemaGraph) -> str:
+    """
+    Go condition when field should be encoded (omitempty semantic of encoding/json). Empty means always.
+    """
+    kind = json_kind(definition)
+    if kind == 'ref':
+        target = graph.target(definition)
+        if target.get('type', 'object') == 'object':
+            return ''
+        return json_present(target, expr, graph)
+    if kind == 'string':
+        return f'{expr} != ""'
+    if kind in ('integer', 'unsigned', 'number'):
+        return f'{expr} != 0'
+    if kind == 'boolean':
+        return f'bool({expr})'
+    if kind == 'array':
+        return f'len({expr}) > 0'
+    if kind == 'any':
+        return f'{expr} != nil'
+    return ''
+
+
+def json_missing(definition: dict, expr: str, graph: SchemaGraph) -> str:
+    """
+    Go condition when required value is missed (zero). Empty if it can't be detected (structs).
+    """
+    kind = json_kind(definition)
+    if kind == 'ref':
+        target = graph.target(definition)
+        if target.get('type', 'object') == 'object' and 'enum' not in target:
+            return ''
+        return json_missing(target, expr, graph)
+    if kind == 'time':
+        return f'{expr}.IsZero()'
+    if kind == 'string':
+        return f'{expr} == ""'
+    if kind in ('integer', 'unsigned', 'number'):
+        return f'{expr} == 0'
+    if kind == 'boolean':
+        return f'!{expr}'
+    if kind == 'array':
+        return f'len({expr}) == 0'
+    if kind == 'any':
+        return f'{expr} == nil'
+    return ''
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Step of validation plan:
+
+    * fail - return error if condition is true;
+    * enum - return error if value is not one of options;
+    * unique - return error if array (of comparable items) has duplicates;
+    * validate - call Validate() of referenced type, error is wrapped by prefix (if set);
+    * items - apply nested rules to every item of array;
+    * when - apply nested rules only if condition is true (optional values).
+    """
+    kind: str
+    expr: str = ''
+    error: str = ''
+    condition: str = ''
+    options: Tuple[str, ...] = ()
+    rules: Tuple['Rule', ...] = ()
+    prefix: str = ''
+    index: str = ''
+    item_type: str = ''
+
+
+class ValidationPlan:
+    """
+    Validation rules of definitions and operation parameters built once per specification.
+    Regular expressions and errors are deduplicated into package-level tables shared by all validators:
+    each pattern is compiled once and success path of validation doesn't allocate.
+    """
+
+    def __init__(self, graph: SchemaGraph):
+        self.graph = graph
+        self.patterns: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self._definitions: Dict[str, Tuple[Rule, ...]] = {}
+        self._parameters: Dict[str, List[Tuple['Parameter', Tuple[Rule, ...]]]] = {}
+        self._visiting = set()
+
+    def pattern(self, regexp: str) -> str:
+        name = self.patterns.get(regexp)
+        if name is None:
+            name = self.patterns[regexp] = f'pattern{len(self.patterns)}'
+        return name
+
+    def error(self, reason: str) -> str:
+        name = self.errors.get(reason)
+        if name is None:
+            name = self.errors[reason] = f'errValidation{len(self.errors)}'
+        return name
+
+    def definition(self, name: str) -> Tuple[Rule, ...]:
+        """
+        Rules of Validate() method of the definition. Receiver is `rec`.
+        """
+        rules = self._definitions.get(name)
+        if rules is not None:
+            return rules
+        if name in self._visiting:
+            # recursive type: Validate() is called for nested values, checks are known when recursion unwinds
+            return Rule('validate'),
+        self._visiting.add(name)
+        try:
+            definition = self.graph.definitions[name]
+            if '$ref' in definition:
+                # alias of another definition: call its Validate() without recursion to own method
+                target = self.graph.ref_name(definition['$ref'])
+                rules = self.schema(definition, f'(*{target})(rec)', '')
+            elif definition.get('type', 'object') == 'object' and 'enum' not in definition:
+                rules = self.object(definition, 'rec')
+            else:
+                rules = self.schema(definition, '(*rec)', '')
+        finally:
+            self._visiting.discard(name)
+        self._definitions[name] = rules
+        return rules
+
+    def parameters(self, method: 'Method') -> List[Tuple['Parameter', Tuple[Rule, ...]]]:
+        """
+        Parameters of operation with their rules (only parameters which have something to check).
+        Presence of parameters is not tracked, so length, bounds and patterns are checked for zero values too
+        (missing value is defined by required flag or default); only enums of optional parameters accept zero value.
+        """
+        ans = self._parameters.get(method.name)
+        if ans is not None:
+            return ans
+        ans = []
+        for param in method.validated_parameters:
+            expr = 'param' + label(param.name)
+            rules = self.schema(param.type, expr, param.name + ': ', wrap=param.name + ': ')
+            if rules and not param.definition.get('required', False):
+                present = json_present(param.type, expr, self.graph)
+                optional = tuple(rule for rule in rules if rule.kind in ('enum', 'validate'))
+                if present and optional:
+                    rules = tuple(rule for rule in rules if rule.kind not in ('enum', 'validate')) + (
+                        Rule('when', condition=present, rules=optional),)
+            if rules:
+                ans.append((param, rules))
+        self._parameters[method.name] = ans
+        return ans
+
+    def items(self, param: 'Parameter') -> Tuple[Rule, ...]:
+        """
+        Rules of single item of streamed array body.
+        """
+        return self.schema(param.type['items'], 'item', param.name + ': ', wrap=param.name + ': ')
+
+    def object(self, definition: dict, expr: str) -> Tuple[Rule, ...]:
+        rules = []
+        required = set(definition.get('required', []))
+        for prop_name, prop in definition.get('properties', {}).items():
+            field = f'{expr}.{label(prop_name)}'
+            nested = self.schema(prop, field, prop_name + ': ')
+            if prop_name in required:
+                missing = json_missing(prop, field, self.graph)
+                if missing:
+                    rules.append(Rule('fail', condition=missing, error=self.error(f"field '{prop_name}' missed")))
+                rules.extend(nested)
+            elif nested:
+                present = json_present(prop, field, self.graph)
+                if present:
+                    rules.append(Rule('when', condition=present, rules=nested))
+                elif json_kind(prop) == 'time':
+                    rules.append(Rule('when', condition=f'!{field}.IsZero()', rules=nested))
+                # optional structs can't be distinguished from empty ones: not validated
+        return tuple(rules)
+
+    def schema(self, schema: dict, expr: str, reason: str, wrap: str = '', depth: int = 0) -> Tuple[Rule, ...]:
+        """
+        Rules for value of the schema referenced by Go expression. Reason prefixes error messages,
+        wrap prefixes errors returned by nested Validate().
+        """
+        if 'schema' in schema:
+            schema = schema['schema']
+        ref = schema.get('$ref')
+        if ref is not None:
+            if self.definition(self.graph.ref_name(ref)):
+                return Rule('validate', expr=expr, prefix=wrap),
+            return ()
+
+        rules = []
+        type_name = schema.get('type')
+        if 'enum' in schema:
+            rules.append(Rule('enum', expr=expr, error=self.error(reason + 'not one of allowed values'),
+                              options=tuple(go_literal(x, schema) for x in schema['enum'])))
+
+        if type_name == 'string' and schema.get('format') != 'date-time':
+            value = f'string({expr})'
+            if 'minLength' in schema:
+                rules.append(Rule('fail', condition=f'utf8.RuneCountInString({value}) < {schema["minLength"]}',
+                                  error=self.error(f'{reason}too short, required at least {schema["minLength"]}')))
+            if 'maxLength' in schema:
+                rules.append(Rule('fail', condition=f'utf8.RuneCountInString({value}) > {schema["maxLength"]}',
+                                  error=self.error(f'{reason}too long, required at most {schema["maxLength"]}')))
+            if 'pattern' in schema:
+                rules.append(Rule('fail', condition=f'!{self.pattern(schema["pattern"])}.MatchString({value})',
+                                  error=self.error(f'{reason}not matched to pattern {schema["pattern"]}')))
+        elif type_name in ('integer', 'number'):
+            unsigned = map_type(schema).startswith('uint')
+            if 'minimum' in schema and not (unsigned and schema['minimum'] <= 0):
+                exclusive = schema.get('exclusiveMinimum', False)
+                rules.append(Rule('fail', condition=compare(schema, expr, '<=' if exclusive else '<', schema['minimum']),
+                                  error=self.error(f'{reason}must be {"greater than" if exclusive else "at least"} '
+                                                   f'{schema["minimum"]}')))
+            if 'maximum' in schema:
+                exclusive = schema.get('exclusiveMaximum', False)
+                rules.append(Rule('fail', condition=compare(schema, expr, '>=' if exclusive else '>', schema['maximum']),
+                                  error=self.error(f'{reason}must be {"less than" if exclusive else "at most"} '
+                                                   f'{schema["maximum"]}')))
+        elif type_name == 'array':
+            items = schema.get('items', {})
+            if 'minItems' in schema:
+                rules.append(Rule('fail', condition=f'len({expr}) < {schema["minItems"]}',
+                                  error=self.error(f'{reason}too few items, required at least {schema["minItems"]}')))
+            if 'maxItems' in schema:
+                rules.append(Rule('fail', condition=f'len({expr}) > {schema["maxItems"]}',
+                                  error=self.error(f'{reason}too many items, required at most {schema["maxItems"]}')))
+            if schema.get('uniqueItems', False) and self.comparable(items):
+                rules.append(Rule('unique', expr=expr, error=self.error(f'{reason}items are not unique'),
+                                  item_type=map_type(items)))
+            index = f'i{depth}'
+            nested = self.schema(items, f'{expr}[{index}]', reason, wrap, depth + 1)
+            if nested:
+                rules.append(Rule('items', expr=expr, index=index, rules=nested))
+        return tuple(rules)
+
+    def comparable(self, schema: dict) -> bool:
+        """
+        Items could be compared by == (uniqueness of other items is not checked).
+        """
+        kind = json_kind(schema)
+        if kind == 'ref':
+            target = self.graph.target(schema)
+            return target.get('type', 'object') != 'object' and self.comparable(target)
+        return kind in ('string', 'integer', 'unsigned', 'number', 'boolean')
+
+    def sample(self, schema: dict, depth: int = 0) -> Optional[str]:
+        """
+        Go expression of valid value of the schema for generated tests. None if it can't be built
+        (for example, string with pattern but without example).
+        """
+        if 'schema' in schema:
+            schema = schema['schema']
+        ref = schema.get('$ref')
+        if ref is not None:
+            name = self.graph.ref_name(ref)
+            target = self.graph.definitions[name]
+            if target.get('type', 'object') == 'object' and 'enum' not in target and '$ref' not in target:
+                if depth > 4:
+                    return None
+                fields = []
+                required = set(target.get('required', []))
+                for prop_name, prop in target.get('properties', {}).items():
+                    value = self.sample(prop, depth + 1)
+                    if value is None and prop_name in required:
+                        return None
+                    if value is not None:
+                        fields.append(f'{label(prop_name)}: {value}')
+                return name + '{' + ', '.join(fields) + '}'
+            value = self.sample(target, depth + 1)
+            return None if value is None else f'{name}({value})'
+
+        type_name = schema.get('type')
+        if 'enum' in schema:
+            return go_literal(schema['enum'][0], schema)
+        if 'example' in schema and type_name in ('string', 'integer', 'number', 'boolean') \
+                and schema.get('format') != 'date-time':
+            return go_literal(schema['example'], schema)
+        if type_name == 'string':
+            if schema.get('format') == 'date-time':
+                return 'time.Date(2021, 2, 3, 4, 5, 6, 0, time.UTC)'
+            if 'pattern' in schema:
+                return None
+            size = max(schema.get('minLength', 1), 1)
+            return json.dumps('x' * min(size, schema.get('maxLength', size)))
+        if type_name == 'boolean':
+            return 'true'
+        if type_name in ('integer', 'number'):
+            low, high = schema.get('minimum'), schema.get('maximum')
+            step = 1 if type_name == 'integer' else 0.5
+            if low is not None and schema.get('exclusiveMinimum', False):
+                low += step
+            if high is not None and schema.get('exclusiveMaximum', False):
+                high -= step
+            if low is not None:
+                return str(low)
+            if high is not None:
+                return str(min(high, 1))
+            return '1'
+        if type_name == 'array':
+            items = schema.get('items', {})
+            count = min(max(schema.get('minItems', 1), 1), schema.get('maxItems', 1 << 10))
+            if count > 1 and schema.get('uniqueItems', False):
+                return None
+            value = self.sample(items, depth + 1)
+            if value is None:
+                return None if count > 0 else 'nil'
+            return map_type(schema) + '{' + ', '.join([value] * count) + '}'
+        return None
+
+
+def go_literal(value, definition: dict) -> str:
+    if isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def compare(definition: dict, expr: str, op: str, bound) -> str:
+    if map_type(definition).startswith(('int', 'uint')) and bound != int(bound):
+        # fractional bound of integer value
+        return f'float64({expr}) {op} {bound}'
+    return f'{expr} {op} {bound}'
 
 
-def detect_package(location: Path) -> str:
-    if not location.is_absolute():
-        location = location.absolute()
-    if location.parent == location:
-        raise FileNotFoundError("go.mod not found in all hierarchy")
+def path(text: str) -> str:
+    return re.sub(r'{(.*?)}', ':\\1', text)
 
-    go_mod = location / 'go.mod'
-    try:
-        content = go_mod.read_text()
-        return re.findall(r'^module\s+"?(.*?)"?$', content, re.MULTILINE | re.DOTALL)[0]
 
-    except FileNotFoundError:
-        return detect_package(location.parent) + "/" + location.name
+def go_duration(seconds: float) -> str:
+    """
+    Go expression of time.Duration in the largest unit which represents the value exactly.
+    """
+    nanoseconds = round(seconds * 1e9)
+    for unit, size in (('Hour', 3600_000_000_000), ('Minute', 60_000_000_000), ('Second', 1_000_000_000),
+                       ('Millisecond', 1_000_000), ('Microsecond', 1_000)):
+        if nanoseconds % size == 0:
+            return f'{nanoseconds // size} * time.{unit}'
+    return f'{nanoseconds} * time.Nanosecond'
 
 
 def label(text: str) -> str:
@@ -191,72 +549,175 @@ def formatter(files: List[str], *gofmt: List[str]):
         try:
             check_call(app + files)
             return
-        except SubprocessError:
+        except (SubprocessError, FileNotFoundError):
             pass
 
 
-def render(swagger: dict, env: Environment, output: Path):
-    env.filters['map_type'] = map_type
+def install_filters(env: Environment, graph: SchemaGraph):
+    env.filters['map_type'] = lambda x, imported=False: graph.lookup(
+        'go_type_imported' if imported else 'go_type', x, lambda d: map_type(d, imported))
     env.filters['label'] = label
     env.filters['private'] = private
     env.filters['path'] = path
     env.filters['from_string'] = from_string
     env.filters['to_string'] = to_string
-    env.filters['default_value'] = lambda x: default_value(x, swagger)
-    env.filters['patterns'] = lambda x: patterns_cache[x]
-    security_type = GoType.parse(swagger.get('x-go-credential-type', 'Credential'), 'security')
+    env.filters['default_value'] = lambda x: graph.lookup('go_default', x, lambda d: default_value(d, graph))
+    env.filters['json_kind'] = json_kind
+    env.filters['go_duration'] = go_duration
+    env.filters['json_bits'] = json_bits
+    env.filters['json_present'] = lambda x, expr: json_present(x, expr, graph)
+
+
+def render(graph: SchemaGraph, env: Environment, job: 'Job', manifest: Manifest):
+    install_filters(env, graph)
+    validation = ValidationPlan(graph)
+    graph.intern('go_type', map_type)
+    graph.intern('go_default', lambda x: default_value(x, graph))
+    security_type = GoType.parse(graph.swagger.get('x-go-credential-type', 'Credential'), 'security')
+    output = job.output
 
     base_file = output / "interfaces.go"
     validations_file = output / "validations.go"
-    client_file = output / "client" / "client.go"
-    server_file = output / "server" / "server.go"
     base_file.parent.absolute().mkdir(parents=True, exist_ok=True)
-    client_file.parent.absolute().mkdir(parents=True, exist_ok=True)
-    server_file.parent.absolute().mkdir(parents=True, exist_ok=True)
     api_package = detect_package(output)
     package = api_package.split('/')[-1]
-    patterns_cache = defaultdict(lambda: f"pattern{len(patterns_cache)}")
+    header = f"// Code generated by simple-swagger {' '.join(job.arguments)} DO NOT EDIT."
+
+    split = job.split_tags or graph.swagger.get('x-go-split-tags', False)
 
-    base_file.write_text(env.get_template('base.jinja2').render(
-        header=f"// Code generated by simple-swagger {' '.join(sys.argv[1:])} DO NOT EDIT.",
+    manifest.write(base_file, env.get_template('base.jinja2').render(
+        header=header,
         package=package,
         credential_type=security_type,
         api_package=api_package,
+        types_only=split,
     ))
 
-    validations_file.write_text(env.get_template('validations.jinja2').render(
-        header=f"// Code generated by simple-swagger {' '.join(sys.argv[1:])} DO NOT EDIT.",
+    if job.fast_json or graph.swagger.get('x-go-fast-json', False):
+        manifest.write(output / "json.go", env.get_template('json.jinja2').render(
+            header=header,
+            package=package,
+        ))
+        if job.tests:
+            manifest.write(output / "json_test.go", env.get_template('json_test.jinja2').render(
+                header=header,
+                package=package,
+            ))
+
+    manifest.write(validations_file, env.get_template('validations.jinja2').render(
+        header=header,
         package=package,
         credential_type=security_type,
         api_package=api_package,
-        patterns_cache=patterns_cache,
+        validation=validation,
     ))
-
-    patterns_cache.clear()
-    server_file.write_text(env.get_template('server.jinja2').render(
-        header=f"// Code generated by simple-swagger {' '.join(sys.argv[1:])} DO NOT EDIT.",
+    if job.tests:
+        manifest.write(output / "validations_test.go", env.get_template('validations_test.jinja2').render(
+            header=header,
+            package=package,
+            validation=validation,
+        ))
+
+    if not split:
+        render_services(env, job, manifest, output, header, api_package, security_type, validation)
+        return
+
+    # package per tag: API subset with aliases of shared definitions, own server and client
+    for tag_package, (tag, methods) in split_by_tags(env.globals['methods']).items():
+        tag_output = output / tag_package
+        manifest.write(tag_output / "interfaces.go", env.get_template('tag.jinja2').render(
+            header=header,
+            package=tag_package,
+            tag=tag,
+            types_package=api_package,
+            validation=validation,
+            methods=methods,
+        ))
+        render_services(env, job, manifest, tag_output, header, api_package + '/' + tag_package, security_type,
+                        validation, methods=methods, tags={})
+
+
+def render_services(env: Environment, job: 'Job', manifest: Manifest, output: Path, header: str, api_package: str,
+                    security_type: GoType, validation: ValidationPlan, **scope):
+    """
+    Renders server and client packages inside output for API package. Scope overrides globals (methods, ...).
+    """
+    manifest.write(output / "server" / "server.go", env.get_template('server.jinja2').render(
+        header=header,
         package="server",
         credential_type=security_type,
         api_package=api_package,
-        patterns_cache=patterns_cache,
+        validation=validation,
+        **scope,
+    ))
+
+    manifest.write(output / "server" / "metrics.go", env.get_template('metrics.jinja2').render(
+        header=header,
+        package="server",
+        **scope,
     ))
 
-    client_file.write_text(env.get_template('client.jinja2').render(
-        header=f"// Code generated by simple-swagger {' '.join(sys.argv[1:])} DO NOT EDIT.",
+    if env.globals['has_security']:
+        manifest.write(output / "server" / "security.go", env.get_template('security.jinja2').render(
+            header=header,
+            package="server",
+            credential_type=security_type,
+            **scope,
+        ))
+
+    manifest.write(output / "client" / "client.go", env.get_template('client.jinja2').render(
+        header=header,
         package="client",
         credential_type=security_type,
         api_package=api_package,
+        **scope,
     ))
 
-    files = [
-        str(base_file),
-        str(validations_file),
-        str(client_file),
-        str(server_file)
-    ]
-
+    if job.tests:
+        manifest.write(output / "server" / "server_test.go", env.get_template('server_test.jinja2').render(
+            header=header,
+            package="server",
+            credential_type=security_type,
+            api_package=api_package,
+            **scope,
+        ))
+
+
+_GO_KEYWORDS = frozenset((
+    'break', 'case', 'chan', 'const', 'continue', 'default', 'defer', 'else', 'fallthrough', 'for', 'func', 'go',
+    'goto', 'if', 'import', 'interface', 'map', 'package', 'range', 'return', 'select', 'struct', 'switch', 'type',
+    'var'))
+
+
+def package_name(text: str) -> str:
+    """
+    Go package name for tag: lower case letters and digits only.
+    """
+    name = re.sub(r'[^0-9a-zA-Z]+', '', text).lower()
+    if not name or name[0].isdigit():
+        name = 'tag' + name
+    if name in _GO_KEYWORDS:
+        name += 'api'
+    return name
+
+
+def split_by_tags(methods: Sequence['Method']) -> Dict[str, Tuple[str, List['Method']]]:
+    """
+    Groups operations by Go package of tag (operation with several tags is placed to each of them).
+    Operations without tags are placed to 'untagged' package.
+    """
+    packages: Dict[str, Tuple[str, List['Method']]] = {}
+    for method in methods:
+        for tag in method.tags or ['untagged']:
+            tag_methods = packages.setdefault(package_name(tag), (tag, []))[1]
+            if not any(m is method for m in tag_methods):
+                tag_methods.append(method)
+    return dict(sorted(packages.items()))
+
+
+def format_files(files: List[Path]):
     formatter(
-        files,
+        [str(file) for file in files],
         ['goimports', '-w'],
         ['gofmt', '-w', '-s']
     )
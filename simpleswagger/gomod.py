@@ -0,0 +1,17 @@
+import re
+from pathlib import Path
+
+
+def detect_package(location: Path) -> str:
+    if not location.is_absolute():
+        location = location.absolute()
+    if location.parent == location:
+        raise FileNotFoundError("go.mod not found in all hierarchy")
+
+    go_mod = location / 'go.mod'
+    try:
+        content = go_mod.read_text()
+        return re.findall(r'^module\s+"?(.*?)"?$', content, re.MULTILINE | re.DOTALL)[0]
+
+    except FileNotFoundError:
+        return detect_package(location.parent) + "/" + location.name
@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+from typing import BinaryIO
+
+
+def is_json(stream: BinaryIO) -> bool:
+    head = stream.peek(64).lstrip()
+    return head.startswith(b'{') or head.startswith(b'[')
+
+
+def normalize_codes(document: dict):
+    """
+    JSON object keys are always strings, while YAML parses response codes as integers (templates rely on it).
+    """
+    if not isinstance(document, dict):
+        return
+    for methods in document.get('paths', {}).values():
+        for definition in methods.values():
+            responses = definition.get('responses') if isinstance(definition, dict) else None
+            if isinstance(responses, dict):
+                definition['responses'] = dict((int(code) if code.isdigit() else code, response)
+                                               for code, response in responses.items())
+
+
+def load_document(location: Path):
+    """
+    Loads YAML or JSON document from file stream without reading it into memory as text first.
+    JSON (detected by content) is parsed by json module, YAML by libyaml if available.
+    """
+    with location.open('rb') as stream:
+        if location.suffix == '.json' or is_json(stream):
+            document = json.load(stream)
+            normalize_codes(document)
+            return document
+
+        import yaml
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        return yaml.load(stream, Loader=loader)
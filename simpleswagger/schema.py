@@ -0,0 +1,185 @@
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .loader import load_document
+
+T = TypeVar('T')
+
+DEFINITIONS = '#/definitions/'
+
+
+def decode_pointer(pointer: str) -> Tuple[str, ...]:
+    return tuple(x.replace('~1', '/').replace('~0', '~') for x in pointer.lstrip('/').split('/') if x != '')
+
+
+class Bundler:
+    """
+    Rewrites specification to contain only local references to definitions:
+
+    * references to parameters and responses (#/parameters/..., #/responses/...) are replaced by a copy of the target;
+    * external references (file.yaml#/definitions/Name, file.yaml) are imported as local definitions.
+    """
+
+    def __init__(self, swagger: dict, location: Path):
+        self.swagger = swagger
+        self.root = location.resolve()
+        self.documents: Dict[Path, dict] = {self.root: swagger}
+        self.imported: Dict[Tuple[Path, str], str] = {}
+
+    def bundle(self):
+        self.walk(self.swagger, self.root)
+
+    def document(self, location: Path) -> dict:
+        document = self.documents.get(location)
+        if document is None:
+            document = self.documents[location] = load_document(location)
+        return document
+
+    def walk(self, node: Any, location: Path):
+        if isinstance(node, list):
+            for item in node:
+                self.walk(item, location)
+            return
+        if not isinstance(node, dict):
+            return
+        ref = node.get('$ref')
+        if isinstance(ref, str):
+            self.replace(node, ref, location)
+        # imports add definitions (to the root document as well) while it is walked
+        for value in list(node.values()):
+            self.walk(value, location)
+
+    def replace(self, node: dict, ref: str, location: Path):
+        file, _, pointer = ref.partition('#')
+        target_location = (location.parent / file).resolve() if file else location
+        path = decode_pointer(pointer)
+        if target_location == self.root and len(path) == 2 and path[0] == 'definitions':
+            return  # already local
+        if len(path) == 2 and path[0] in ('parameters', 'responses'):
+            # inline copy: operations may alter parameters and responses (hoisting of anonymous objects)
+            target = deepcopy(self.resolve(target_location, path))
+            node.clear()
+            node.update(target)
+            self.walk(node, target_location)
+            return
+        node['$ref'] = DEFINITIONS + self.import_definition(target_location, path)
+
+    def resolve(self, location: Path, path: Tuple[str, ...]) -> dict:
+        node = self.document(location)
+        for key in path:
+            node = node[key]
+        return node
+
+    def import_definition(self, location: Path, path: Tuple[str, ...]) -> str:
+        key = (location, '/'.join(path))
+        name = self.imported.get(key)
+        if name is not None:
+            return name
+        definitions = self.swagger.setdefault('definitions', {})
+        base_name = path[-1] if len(path) > 0 else location.stem
+        name, index = base_name, 1
+        while name in definitions:
+            index += 1
+            name = base_name + str(index)
+        self.imported[key] = name
+        definition = definitions[name] = deepcopy(self.resolve(location, path))
+        self.walk(definition, location)
+        return name
+
+
+def bundle(swagger: dict, location: Path) -> List[Path]:
+    """
+    Bundles specification in place. Returns locations of other documents it references.
+    """
+    bundler = Bundler(swagger, location)
+    bundler.bundle()
+    return sorted(document for document in bundler.documents if document != bundler.root)
+
+
+class SchemaGraph:
+    """
+    Index of specification schemas built once after anonymous objects moved to definitions.
+    Definitions are addressed by reference and derived values (type names, default values, ...)
+    are computed once per schema and then served from memo.
+    """
+
+    def __init__(self, swagger: dict):
+        self.swagger = swagger
+        self.definitions: Dict[str, dict] = swagger.get('definitions', {})
+        self._names: Dict[str, str] = {}
+        self._memo: Dict[Tuple[str, int], Tuple[dict, Any]] = {}
+
+    def ref_name(self, ref: str) -> str:
+        name = self._names.get(ref)
+        if name is None:
+            name = self._names[ref] = ref.split('/')[-1]
+        return name
+
+    def definition(self, ref: str) -> dict:
+        return self.definitions[self.ref_name(ref)]
+
+    def target(self, schema: dict) -> dict:
+        """
+        Unwraps parameter schema and follows reference.
+        """
+        if 'schema' in schema:
+            schema = schema['schema']
+        if '$ref' in schema:
+            return self.definition(schema['$ref'])
+        return schema
+
+    def lookup(self, kind: str, schema: dict, compute: Callable[[dict], T]) -> T:
+        key = (kind, id(schema))
+        cached = self._memo.get(key)
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        value = compute(schema)
+        self._memo[key] = (schema, value)
+        return value
+
+    def intern(self, kind: str, compute: Callable[[dict], T]):
+        """
+        Precomputes value for all definitions.
+        """
+        for definition in self.definitions.values():
+            self.lookup(kind, definition, compute)
+
+    def needs_validation(self, schema: dict) -> bool:
+        """
+        True if schema (including referenced definitions) has constraints checked by generated validators.
+        """
+        return self.lookup('needs_validation', schema, lambda x: self._needs_validation(x, set()))
+
+    def _needs_validation(self, schema: dict, visited: set) -> bool:
+        """
+        Searches constraints in schemas reachable from schema. Definitions are visited once per search: the
+        answer is True as soon as any constraint is found, so revisited definition can't change it. Results
+        depend on the whole search, so only results of top-level calls are memoized.
+        """
+        if 'schema' in schema:
+            return self._needs_validation(schema['schema'], visited)
+        if '$ref' in schema:
+            name = self.ref_name(schema['$ref'])
+            if name in visited:
+                return False
+            visited.add(name)
+            definition = self.definitions[name]
+            cached = self._memo.get(('needs_validation', id(definition)))
+            if cached is not None and cached[0] is definition:
+                return cached[1]
+            return self._needs_validation(definition, visited)
+        type_name = schema.get('type')
+        if 'enum' in schema:
+            return True
+        if type_name == 'object':
+            return len(schema.get('required', [])) > 0 or any(
+                self._needs_validation(x, visited) for x in schema.get('properties', {}).values())
+        if type_name == 'string':
+            return any(x in schema for x in ('pattern', 'minLength', 'maxLength'))
+        if type_name in ('integer', 'number'):
+            return any(x in schema for x in ('minimum', 'maximum'))
+        if type_name == 'array':
+            return any(x in schema for x in ('minItems', 'maxItems', 'uniqueItems')) or self._needs_validation(
+                schema.get('items', {}), visited)
+        return False
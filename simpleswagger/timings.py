@@ -0,0 +1,134 @@
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Dict, List, Optional, TextIO, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+
+@dataclass
+class Stat:
+    calls: int = 0
+    seconds: float = 0
+    peak: int = 0  # the largest growth of traced memory during single call, in bytes
+
+
+@dataclass
+class _Frame:
+    started: float
+    memory: int
+    peak: int
+
+
+class Timings:
+    """
+    Wall time and peak memory of generation phases and rendered templates. Memory is traced by tracemalloc
+    which slows down generation, so it is enabled only on demand. Nested measurements are allowed: peak of
+    inner measurement is accounted in outer one as well.
+    """
+
+    def __init__(self):
+        import tracemalloc  # imported only when timings are enabled
+        self.phases: Dict[str, Stat] = {}
+        self.templates: Dict[str, Stat] = {}
+        self._stack: List[_Frame] = []
+        self._tracemalloc = tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def measure(self, stats: Dict[str, Stat], name: str):
+        tracemalloc = self._tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        frame = _Frame(time.perf_counter(), current, current)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame.started
+            frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, frame.peak)
+            stat = stats.setdefault(name, Stat())
+            stat.calls += 1
+            stat.seconds += elapsed
+            stat.peak = max(stat.peak, frame.peak - frame.memory)
+
+    def phase(self, name: str):
+        return self.measure(self.phases, name)
+
+    def template(self, name: str):
+        return self.measure(self.templates, name)
+
+    def instrument(self, env: 'Environment'):
+        """
+        Makes templates loaded by environment measure own rendering.
+        """
+        timings = self
+
+        class TimedTemplate(env.template_class):
+            def render(self, *args, **kwargs):
+                with timings.template(self.name):
+                    return super().render(*args, **kwargs)
+
+        env.template_class = TimedTemplate
+
+    def report(self, out: TextIO = sys.stderr):
+        for title, stats in (('phase', self.phases), ('template', self.templates)):
+            if not stats:
+                continue
+            width = max(len(title), *(len(name) for name in stats))
+            out.write(f"{title:<{width}}  {'calls':>6}  {'total':>10}  {'average':>10}  {'peak':>10}\n")
+            for name, stat in sorted(stats.items(), key=lambda kv: -kv[1].seconds):
+                out.write(f"{name:<{width}}  {stat.calls:>6}  {format_seconds(stat.seconds):>10}  "
+                          f"{format_seconds(stat.seconds / stat.calls):>10}  {format_bytes(stat.peak):>10}\n")
+            out.write('\n')
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f'{seconds:.2f}s'
+    return f'{seconds * 1000:.2f}ms'
+
+
+def format_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ('B', 'KiB', 'MiB'):
+        if value < 1024:
+            return f'{value:.1f}{unit}'
+        value /= 1024
+    return f'{value:.1f}GiB'
+
+
+_timings: Optional[Timings] = None
+
+
+def enable() -> Timings:
+    """
+    Starts collection of timings in current process.
+    """
+    global _timings
+    if _timings is None:
+        _timings = Timings()
+    return _timings
+
+
+def phase(name: str):
+    """
+    Measures block as generation phase if timings are enabled.
+    """
+    if _timings is None:
+        return nullcontext()
+    return _timings.phase(name)
+
+
+def instrument(env: 'Environment'):
+    if _timings is not None:
+        _timings.instrument(env)
@@ -1,8 +1,16 @@
+import re
 from pathlib import Path
 from subprocess import check_call, SubprocessError
+from typing import Dict, List, Sequence, TYPE_CHECKING
 
 from jinja2 import Environment
 
+from .cache import Manifest
+from .schema import SchemaGraph
+
+if TYPE_CHECKING:
+    from .generator import Job, Method
+
 __help = '''
 integer	integer	int32	signed 32 bits
 long	integer	int64	signed 64 bits
@@ -36,17 +44,58 @@ def map_basic_type(schema: dict) -> str:
     return 'any'
 
 
-def render(swagger: dict, env: Environment, output: Path):
-    env.filters['map_type'] = map_basic_type
-    content = env.get_template('typescript/types.jinja2').render()
-    output.mkdir(parents=True, exist_ok=True)
-    types_file = (output / "index.ts")
-    types_file.write_text(content)
+def install_filters(env: Environment, graph: SchemaGraph):
+    env.filters['map_type'] = lambda x: graph.lookup('ts_type', x, map_basic_type)
+
+
+def render(graph: SchemaGraph, env: Environment, job: 'Job', manifest: Manifest):
+    install_filters(env, graph)
+    job.output.mkdir(parents=True, exist_ok=True)
+    if not (job.functions or graph.swagger.get('x-ts-functions', False)):
+        manifest.write(job.output / "index.ts", env.get_template('typescript/types.jinja2').render())
+        return
+
+    # standalone function per operation, so bundlers can drop unused ones
+    methods = env.globals['methods']
+    if job.split_tags or graph.swagger.get('x-ts-split-tags', False):
+        modules = split_by_tags(methods)
+    else:
+        modules = {'operations': methods}
+    manifest.write(job.output / "types.ts", env.get_template('typescript/functions/types.jinja2').render())
+    manifest.write(job.output / "runtime.ts", env.get_template('typescript/functions/runtime.jinja2').render())
+    for module, module_methods in modules.items():
+        manifest.write(job.output / (module + ".ts"),
+                       env.get_template('typescript/functions/operations.jinja2').render(methods=module_methods))
+    manifest.write(job.output / "index.ts",
+                   env.get_template('typescript/functions/index.jinja2').render(modules=list(modules)))
+
+
+_RESERVED_MODULES = ('index', 'operations', 'runtime', 'types')
+
+
+def module_name(tag: str) -> str:
+    """
+    TypeScript module name for tag: lower case letters, digits and dashes.
+    """
+    name = re.sub(r'[^0-9a-zA-Z]+', '-', tag).strip('-').lower() or 'untagged'
+    if name in _RESERVED_MODULES:
+        name += '-api'
+    return name
+
+
+def split_by_tags(methods: Sequence['Method']) -> Dict[str, List['Method']]:
+    """
+    Groups operations by module of the first tag (function is exported once, so index can re-export all modules).
+    Operations without tags are placed to 'untagged' module.
+    """
+    modules: Dict[str, List['Method']] = {}
+    for method in methods:
+        tag = method.tags[0] if method.tags else 'untagged'
+        modules.setdefault(module_name(tag), []).append(method)
+    return modules
 
-    files = [
-        types_file
-    ]
 
+def format_files(files: List[Path]):
     try:
         check_call(['prettier', '--write'] + [str(f) for f in files])
     except (SubprocessError, FileNotFoundError) as err:
@@ -0,0 +1,59 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from simpleswagger.generator import Job, collect_jobs
+
+
+class CollectJobsTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.root = Path(self._directory.name)
+        self._cwd = os.getcwd()
+        os.chdir(self.root)
+        for name in ('billing', 'users'):
+            (self.root / name).mkdir()
+            (self.root / name / 'swagger.yaml').write_text('swagger: "2.0"')
+        self.defaults = Job(Path('swagger.yaml'), Path('api'), Path('templates'), tests=True)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._directory.cleanup()
+
+    def test_batch_places_output_next_to_each_spec(self):
+        jobs = collect_jobs(['*/swagger.yaml'], None, self.defaults)
+
+        self.assertEqual([job.output for job in jobs], [self.root.resolve() / 'billing' / 'api',
+                                                        self.root.resolve() / 'users' / 'api'])
+        self.assertEqual(jobs[0].arguments, ('-s', 'billing/swagger.yaml', '-o', 'billing/api', '-l', 'golang',
+                                             '--tests'))
+
+    def test_jobs_file_paths_are_relative_to_file(self):
+        (self.root / 'jobs.yaml').write_text('- {swagger: billing/swagger.yaml, output: billing/client, '
+                                             'lang: typescript}\n'
+                                             '- {swagger: users/swagger.yaml, output: users/api}\n')
+
+        jobs = collect_jobs([], Path('jobs.yaml'), self.defaults)
+
+        self.assertEqual([(job.swagger.name, job.output.name, job.lang) for job in jobs],
+                         [('swagger.yaml', 'client', 'typescript'), ('swagger.yaml', 'api', 'golang')])
+        self.assertNotIn(str(self.root), ' '.join(jobs[0].arguments))
+
+    def test_same_job_twice_is_generated_once(self):
+        (self.root / 'jobs.yaml').write_text('- {swagger: users/swagger.yaml, output: users/api}\n')
+
+        jobs = collect_jobs(['users/swagger.yaml'], Path('jobs.yaml'), self.defaults)
+
+        self.assertEqual(len(jobs), 1)
+
+    def test_duplicate_output_is_rejected(self):
+        (self.root / 'jobs.yaml').write_text('- {swagger: billing/swagger.yaml, output: api}\n'
+                                             '- {swagger: users/swagger.yaml, output: api}\n')
+
+        with self.assertRaises(ValueError):
+            collect_jobs([], Path('jobs.yaml'), self.defaults)
+
+
+if __name__ == '__main__':
+    unittest.main()
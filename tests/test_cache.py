@@ -0,0 +1,36 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from simpleswagger.cache import generation_key
+from simpleswagger.generator import generation_arguments
+
+TEMPLATES = Path(__file__).parent.parent / 'simpleswagger' / 'templates'
+
+
+class GenerationKeyTest(unittest.TestCase):
+    def test_referenced_document_changes_key(self):
+        with TemporaryDirectory() as directory:
+            spec, models = Path(directory) / 'swagger.yaml', Path(directory) / 'models.yaml'
+            spec.write_text('swagger: "2.0"')
+            models.write_text('definitions: {}')
+            key = generation_key(spec, [str(models)], TEMPLATES, ['golang'])
+
+            models.write_text('definitions: {Pet: {type: object}}')
+
+            self.assertNotEqual(key, generation_key(spec, [str(models)], TEMPLATES, ['golang']))
+            models.unlink()
+            self.assertNotEqual(key, generation_key(spec, [str(models)], TEMPLATES, ['golang']))
+
+
+
+class GenerationArgumentsTest(unittest.TestCase):
+    def test_options_without_effect_on_output_are_excluded(self):
+        arguments = generation_arguments(['-s', 'swagger.yaml', '-f', '--timings', '--profile', 'out.prof', '--tests',
+                                          '--force', '--profile=out.prof'])
+
+        self.assertEqual(arguments, ('-s', 'swagger.yaml', '--tests'))
+
+
+if __name__ == '__main__':
+    unittest.main()
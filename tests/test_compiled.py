@@ -0,0 +1,42 @@
+import shutil
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from simpleswagger import generator
+from simpleswagger.compiled import MemoryBytecodeCache, PackageBytecodeCache
+
+PACKAGE = Path(__file__).parent.parent / 'simpleswagger'
+SPEC = Path(__file__).parent.parent / 'test-data' / 'swagger.yaml'
+
+
+class RecordingCache(PackageBytecodeCache):
+    def __init__(self, directory: Path):
+        super().__init__(directory)
+        self.hits = []
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is not None:
+            self.hits.append(bucket.key)
+
+
+class PrecompiledTest(unittest.TestCase):
+    def test_generation_uses_precompiled_templates(self):
+        with TemporaryDirectory() as directory:
+            package = Path(directory) / 'package'
+            shutil.copytree(PACKAGE / 'templates', package / 'templates')
+            generator.precompile(package)
+            (Path(directory) / 'go.mod').write_text('module example.com/test\n')
+            persistent = RecordingCache(package / '_compiled')
+            job = generator.Job(SPEC, Path(directory) / 'api', package / 'templates')
+
+            with mock.patch.object(generator, '_bytecode_cache', MemoryBytecodeCache(persistent)):
+                self.assertIsNotNone(generator.generate(job))
+
+            self.assertIn(persistent.get_cache_key('server.jinja2'), persistent.hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
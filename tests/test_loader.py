@@ -0,0 +1,48 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import yaml
+
+from simpleswagger.loader import load_document
+
+SPEC = Path(__file__).parent.parent / 'test-data' / 'swagger.yaml'
+
+
+class LoadDocumentTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.root = Path(self._directory.name)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_json_matches_yaml(self):
+        expected = load_document(SPEC)
+        converted = self.root / 'swagger.json'
+        converted.write_text(json.dumps(yaml.safe_load(SPEC.read_text())))
+
+        self.assertEqual(load_document(converted), expected)
+
+    def test_json_detected_by_content(self):
+        spec = self.root / 'swagger.yaml'
+        spec.write_text('\n  {"swagger": "2.0", "paths": {"/pets": {"parameters": [], "get": '
+                        '{"responses": {"200": {"description": "OK"}, "default": {"description": "Error"}}}}}}')
+
+        document = load_document(spec)
+
+        self.assertEqual(list(document['paths']['/pets']['get']['responses']), [200, 'default'])
+
+    def test_yaml(self):
+        spec = self.root / 'swagger.yaml'
+        spec.write_text('swagger: "2.0"\npaths:\n  /pets:\n    get:\n      responses:\n        200:\n'
+                        '          description: OK\n')
+
+        document = load_document(spec)
+
+        self.assertEqual(document['paths']['/pets']['get']['responses'], {200: {'description': 'OK'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
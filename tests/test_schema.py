@@ -0,0 +1,88 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from simpleswagger.loader import load_document
+from simpleswagger.schema import SchemaGraph, bundle
+
+
+def write(directory: Path, name: str, document: dict) -> Path:
+    file = directory / name
+    file.write_text(json.dumps(document))
+    return file
+
+
+def operation(ref: str) -> dict:
+    return {'get': {'operationId': 'pets', 'responses': {200: {'description': 'ok', 'schema': {'$ref': ref}}}}}
+
+
+class BundleTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.root = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def bundle(self, file: Path) -> dict:
+        swagger = load_document(file)
+        bundle(swagger, file)
+        return swagger
+
+    def test_external_ref_without_root_definitions(self):
+        write(self.root, 'pet.json', {'type': 'object', 'properties': {'name': {'type': 'string'}}})
+        spec = write(self.root, 'swagger.json', {'swagger': '2.0', 'paths': {'/pets': operation('pet.json')}})
+
+        swagger = self.bundle(spec)
+
+        self.assertEqual(swagger['paths']['/pets']['get']['responses'][200]['schema'], {'$ref': '#/definitions/pet'})
+        self.assertEqual(swagger['definitions']['pet']['properties'], {'name': {'type': 'string'}})
+
+    def test_external_ref_nested_in_definition(self):
+        write(self.root, 'models.json', {'definitions': {
+            'Owner': {'type': 'object', 'properties': {'name': {'type': 'string'}}},
+        }})
+        spec = write(self.root, 'swagger.json', {
+            'swagger': '2.0',
+            'paths': {'/pets': operation('#/definitions/Pet')},
+            'definitions': {
+                'Pet': {'type': 'object', 'properties': {'owner': {'$ref': 'models.json#/definitions/Owner'}}},
+            },
+        })
+
+        swagger = self.bundle(spec)
+
+        self.assertEqual(swagger['definitions']['Pet']['properties']['owner'], {'$ref': '#/definitions/Owner'})
+        self.assertIn('Owner', swagger['definitions'])
+
+
+def ref(name: str) -> dict:
+    return {'$ref': '#/definitions/' + name}
+
+
+class NeedsValidationTest(unittest.TestCase):
+    def test_self_reference_with_required_field(self):
+        tree = {'type': 'object', 'required': ['name'], 'properties': {
+            'name': {'type': 'string'},
+            'children': {'type': 'array', 'items': ref('Tree')},
+        }}
+        graph = SchemaGraph({'definitions': {'Tree': tree, 'Forest': {'type': 'array', 'items': ref('Tree')}}})
+
+        self.assertTrue(graph.needs_validation(tree['properties']['children']))
+        self.assertTrue(graph.needs_validation(tree))
+        self.assertTrue(graph.needs_validation(graph.definitions['Forest']))
+
+    def test_cycle_does_not_depend_on_order(self):
+        for order in (('Parent', 'Child'), ('Child', 'Parent')):
+            parent = {'type': 'object', 'properties': {'child': ref('Child')}}
+            child = {'type': 'object', 'properties': {'parent': ref('Parent'), 'age': {'type': 'integer', 'minimum': 0}}}
+            graph = SchemaGraph({'definitions': {'Parent': parent, 'Child': child}})
+            results = dict((name, graph.needs_validation(graph.definitions[name])) for name in order)
+            results['ref'] = graph.needs_validation(child['properties']['parent'])
+
+            self.assertEqual(results, {'Parent': True, 'Child': True, 'ref': True}, order)
+
+
+if __name__ == '__main__':
+    unittest.main()